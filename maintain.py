@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
 
 import argparse
-from dataclasses import dataclass
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from functools import cached_property, partial
-import locale
+from functools import cache, partial
+import hashlib
+import importlib
+from operator import attrgetter
+import os
 from pathlib import Path
 import re
-import readline
 import shlex
-import shutil
+import signal
 import subprocess
 import sys
-import tempfile
 from typing import Callable, Iterable, List, Mapping
 
 warn = partial(print, file=sys.stderr)
@@ -23,6 +25,8 @@ warn = partial(print, file=sys.stderr)
 
 # name of directory to hold index
 INDEX_DIR = ".index"
+# name of directory inside INDEX_DIR to cache extracted text contents
+TEXT_CACHE_DIR = "text"
 # name of directory where new pages will be stored
 DEFAULT_CATEGORY = "_toSort"
 # languages to apply OCR in
@@ -48,11 +52,12 @@ PDF_VIEWER_ARGS = ["zathura", "--mode=fullscreen"]
 # === Patterns
 
 
-SCAN_SUFFIXES = [ # Regexes
-    "jpe?g",
-    "pdf",
-    "png",
-]
+SCAN_SUFFIXES = {
+    ".jpeg",
+    ".jpg",
+    ".pdf",
+    ".png",
+}
 
 ID_REGEX = re.compile(r"""^
     (
@@ -84,34 +89,37 @@ SCAN_REGEX = re.compile(r"""^
         _(?P<description>.*)
     )?
     # Suffix
-    \.(""" + "|".join(SCAN_SUFFIXES) + r""")
+    \.(""" + "|".join(re.escape(suffix[1:]) for suffix in sorted(SCAN_SUFFIXES)) + r""")
 $""", re.VERBOSE)
-SCAN_WARN_REGEX = re.compile(r"\.(" + "|".join(SCAN_SUFFIXES) + r")$")
 
 NUMBER_REGEX = re.compile(r"^\d+$")
-CONTENT_SPLIT_REGEX = re.compile(r"[\W]")
-
-DATE_REGEX = re.compile(r"(\d{2,4}-\d{1,2}-\d{1,2}|\d{1,2}\.\d{1,2}\.\d{2,4}|\d{1,2}\.\s+[a-zA-Z]+\s+\d{2,4})")
-DATE_FORMATS = [  # date.strptime compatible
-    "%Y-%m-%d",
-    "%y-%m-%d",
-    "%d.%m.%Y",
-    "%d.%m.%y",
-    "%d. %B %Y",
-    "%d. %B %y",
-    "%d. %b %Y",
-    "%d. %b %y",
-]
+WORD_REGEX = re.compile(r"\w{3,}") # words usable for autocompletion
+
+DATE_REGEX = re.compile(r"(?P<iso>\d{2,4}-\d{1,2}-\d{1,2})|(?P<dmy>\d{1,2}\.\d{1,2}\.\d{2,4})|(?P<dmonthy>\d{1,2}\.\s+[a-zA-Z]+\s+\d{2,4})")
+DATE_FORMATS = {  # per DATE_REGEX group, date.strptime compatible
+    "iso": [
+        "%Y-%m-%d",
+        "%y-%m-%d",
+    ],
+    "dmy": [
+        "%d.%m.%Y",
+        "%d.%m.%y",
+    ],
+    "dmonthy": [
+        "%d. %B %Y",
+        "%d. %B %y",
+        "%d. %b %Y",
+        "%d. %b %y",
+    ],
+}
+DATE_OUTPUT_FORMAT = DATE_FORMATS["iso"][0]
 
 
 # === Code
 
 
-def build_args(args: Iterable) -> str:
-    return " ".join((shlex.quote(str(e)) for e in args))
-
-def build_ocr_args(in_file: str, out_file: str, ocr_langs: Iterable[str] = OCR_LANGS, additional_args: Iterable = []) -> str:
-    return build_args([
+def build_ocr_args(in_file: str, out_file: str, ocr_langs: Iterable[str] = OCR_LANGS, additional_args: Iterable = []) -> list[str]:
+    return [str(e) for e in [
         "ocrmypdf",
         "--skip-text",
         "--pdfa-image-compression", "jpeg", # usable as only applied once
@@ -120,9 +128,57 @@ def build_ocr_args(in_file: str, out_file: str, ocr_langs: Iterable[str] = OCR_L
         *additional_args,
         in_file,
         out_file,
-    ])
+    ]]
+
+# OCR is parallelized over files, so each tesseract should only use a single thread
+OCR_ENV_OVERRIDES = {"OMP_THREAD_LIMIT": "1"}
+
+def ocr_env() -> Mapping[str, str]:
+    return {**os.environ, **OCR_ENV_OVERRIDES}
+
+def run_pipe(producer_args: list[str], consumer_args: list[str]):
+    with subprocess.Popen(producer_args, stdout=subprocess.PIPE) as producer:
+        with subprocess.Popen(consumer_args, stdin=producer.stdout) as consumer:
+            producer.stdout.close() # so producer receives SIGPIPE if consumer exits early
+    # producer is killed by SIGPIPE if consumer exits early, then the consumer is to blame
+    if producer.returncode not in (0, -signal.SIGPIPE):
+        raise subprocess.CalledProcessError(producer.returncode, producer.args)
+    if consumer.returncode != 0:
+        raise subprocess.CalledProcessError(consumer.returncode, consumer.args)
+
+@cache
+def import_optional(name: str):
+    # for optional Python bindings, imported lazily as they slow down startup
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+tesseract_apis = None
+tesseract_api_failed = False
+
+def get_tesseract_api():
+    # engine is kept loaded for following images, one per thread as it is not thread-safe
+    global tesseract_apis, tesseract_api_failed
+    os.environ.update(OCR_ENV_OVERRIDES) # before tesserocr gets loaded
+    tesserocr = import_optional("tesserocr")
+    if tesserocr is None or tesseract_api_failed:
+        return None
+    if tesseract_apis is None:
+        import threading
+        tesseract_apis = threading.local()
+    api = getattr(tesseract_apis, "api", None)
+    if api is None:
+        try:
+            api = tesseract_apis.api = tesserocr.PyTessBaseAPI(lang="+".join(OCR_LANGS))
+        except RuntimeError as e: # e.g. missing language data, handled like missing bindings
+            warn(f"Failed to initialize tesserocr, using tesseract command instead: {e}")
+            tesseract_api_failed = True
+            return None
+    return api
 
 def rlinput(prompt, prefill=None, suggestions=[]):
+    import readline # imported lazily as it slows down startup
     if suggestions and prefill is None:
         prefill = suggestions.pop(0)
     readline.clear_history()
@@ -135,7 +191,7 @@ def rlinput(prompt, prefill=None, suggestions=[]):
         readline.set_startup_hook()
 
 
-@dataclass(eq=True, order=True, frozen=True)
+@dataclass(eq=True, order=True, frozen=True, slots=True)
 class IdRange:
     first: int
     last: int
@@ -219,36 +275,46 @@ class IdRange:
         return self.fancy
 
 
-def interpret_date(text: str) -> datetime:
-    for date_format in DATE_FORMATS:
+def interpret_date(m: re.Match) -> datetime:
+    # only try formats fitting to the matched alternative of DATE_REGEX
+    for date_format in DATE_FORMATS[m.lastgroup]:
         try:
-            return datetime.strptime(text, date_format)
+            return datetime.strptime(m.group(0), date_format)
         except ValueError:
             continue
     return None
 
 def format_date(date: datetime) -> str:
-    return date.strftime(DATE_FORMATS[0])
+    return date.strftime(DATE_OUTPUT_FORMAT)
 
 def avg(dates: list[datetime]) -> datetime:
-    m = min(dates)
-    s = sum((date - m for date in dates), start=timedelta())
-    return m + (s / len(dates))
+    # only respects the day of each date, as parsed dates do not have a time
+    days = sum(date.toordinal() for date in dates) / len(dates)
+    return datetime.fromordinal(int(days)) + timedelta(days=days % 1)
 
 
-@dataclass
+@dataclass(slots=True)
 class ScanFile:
     path: Path
     date: str
     id_range: IdRange
     description: str
+    # copied from id_range, as frequently accessed while sorting & resolving
+    first_id: int = field(init=False, repr=False, compare=False)
+    last_id: int = field(init=False, repr=False, compare=False)
+    is_digital: bool = field(init=False, repr=False, compare=False)
+    # cached results of properties below, slots do not allow functools.cached_property
+    _text_content: str = field(default=None, init=False, repr=False, compare=False)
+    _most_common_words: list[str] = field(default=None, init=False, repr=False, compare=False)
+    _all_dates_from_content: list[datetime] = field(default=None, init=False, repr=False, compare=False)
 
     @classmethod
     def from_path(cls, path: Path):
+        if path.suffix not in SCAN_SUFFIXES: # cheap check before matching SCAN_REGEX
+            return None
         m = SCAN_REGEX.match(path.name)
         if not m:
-            if SCAN_WARN_REGEX.search(path.name):
-                warn(f"{path}: Seems like a scanned document, but name is invalid")
+            warn(f"{path}: Seems like a scanned document, but name is invalid")
             return None
         date = m.group("date")
         id_range = IdRange.from_match(m)
@@ -257,17 +323,10 @@ class ScanFile:
         desc = m.group("description")
         return ScanFile(path, date, id_range, desc)
 
-    @property
-    def first_id(self):
-        return self.id_range.first
-
-    @property
-    def last_id(self):
-        return self.id_range.last
-
-    @property
-    def is_digital(self):
-        return self.id_range.is_digital
+    def __post_init__(self):
+        self.first_id = self.id_range.first
+        self.last_id = self.id_range.last
+        self.is_digital = self.id_range.is_digital
 
     @property
     def title(self):
@@ -279,14 +338,74 @@ class ScanFile:
     def title_or_content(self):
         if self.description:
             return self.description
-        return ",".join(self.most_common_words[:6])
+        return ",".join(self.most_common_words)
 
     @property
     def has_already_ocr(self) -> bool:
         return self.path.suffix == ".pdf"
 
-    @cached_property
+    @property
+    def text_cache_path(self) -> Path:
+        stat = self.path.stat()
+        key = hashlib.blake2b(f"{self.path}|{stat.st_mtime_ns}|{stat.st_size}".encode(), digest_size=16).hexdigest()
+        return Path(INDEX_DIR) / TEXT_CACHE_DIR / f"{key}.txt"
+
+    @property
     def text_content(self) -> str:
+        if self._text_content is None:
+            self._text_content = self.read_text_content()
+        return self._text_content
+
+    def read_text_content(self) -> str:
+        cache_path = self.cache_text_content()
+        if cache_path is None:
+            text = self.extract_text_content_by_bindings()
+            if text is None:
+                text = subprocess.run(self.text_extract_args, shell=False, check=True, capture_output=True, text=True, env=ocr_env()).stdout
+            return text
+        return cache_path.read_text(encoding="utf-8")
+
+    def cache_text_content(self) -> Path:
+        # returns None if cache is not writable
+        cache_path = self.text_cache_path
+        if cache_path.is_file():
+            return cache_path
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = tmp_path.open("wb")
+        except OSError as e:
+            warn(f"{self.path}: Failed to cache text content: {e}")
+            return None
+        try:
+            with tmp_file:
+                text = self.extract_text_content_by_bindings()
+                if text is None:
+                    # let extractor write directly into the cache, so the output is never buffered here
+                    subprocess.run(self.text_extract_args, shell=False, check=True, stdout=tmp_file, env=ocr_env())
+                else:
+                    tmp_file.write(text.encode("utf-8"))
+            tmp_path.replace(cache_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return cache_path
+
+    def extract_text_content_by_bindings(self) -> str:
+        # returns None if required Python bindings are not installed
+        if self.has_already_ocr:
+            pdftotext = import_optional("pdftotext")
+            if pdftotext is None:
+                return None
+            with self.path.open("rb") as fp:
+                return "\f".join(pdftotext.PDF(fp)) # pages separated like pdftotext does
+        api = get_tesseract_api()
+        if api is None:
+            return None
+        api.SetImageFile(str(self.path.resolve()))
+        return api.GetUTF8Text()
+
+    @property
+    def text_extract_args(self) -> list[str]:
         if self.has_already_ocr:
             cmd = [
                 "pdftotext",
@@ -296,49 +415,46 @@ class ScanFile:
                 "tesseract",
                 "-l", "+".join(OCR_LANGS),
             ]
-        cmd += [
+        return cmd + [
             str(self.path.resolve()),
             "-",
         ]
-        proc = subprocess.run(cmd, shell=False, check=True, capture_output=True, text=True)
-        return proc.stdout
 
     @property
     def autocomplete_content(self) -> list[str]:
-        return [e for e in CONTENT_SPLIT_REGEX.split(self.text_content) if len(e) >= 3]
+        return WORD_REGEX.findall(self.text_content)
 
-    @cached_property
+    @property
     def most_common_words(self) -> list[str]:
-        word_counter = dict()
-        for word in self.autocomplete_content:
-            if word in word_counter:
-                word_counter[word] += 1
-            else:
-                word_counter[word] = 1
-        return [item[0] for item in sorted(word_counter.items(), key=lambda item: item[1])]
+        if self._most_common_words is None:
+            self._most_common_words = [word for word, _ in Counter(self.autocomplete_content).most_common(6)]
+        return self._most_common_words
 
-    @cached_property
+    @property
     def all_dates_from_content(self) -> list[datetime]:
+        if self._all_dates_from_content is None:
+            self._all_dates_from_content = self.find_all_dates_from_content()
+        return self._all_dates_from_content
+
+    def find_all_dates_from_content(self) -> list[datetime]:
         # TODO date https://stackoverflow.com/questions/7821661/how-to-code-autocompletion-in-python
         dates = set()
         for probable_date in DATE_REGEX.finditer(self.text_content):
-            probable_date_filtered = re.sub(r"\s", " ", probable_date.group(0))
-            date = interpret_date(probable_date_filtered)
+            date = interpret_date(probable_date)
             if date and date not in dates:
                 dates.add(date)
         if len(dates) <= 1:
             return list(dates)
-        older_dates = set()
-        min_date = min(dates)
-        max_date = max(dates)
-        date_subset = dates - {min_date,}
-        while len(date_subset) > 0 and max_date - min_date >= 2 * (max_date - min(date_subset)):
-            dates = date_subset
-            date_subset = dates - {min_date,}
-            older_dates.add(min_date)
-            min_date = min(dates)
-        avg_date = avg(dates) + (max_date - min_date) * .2
-        return sorted(dates, key=lambda date: abs(avg_date - date)) + sorted(older_dates, reverse=True)
+        sorted_dates = sorted(dates)
+        max_date = sorted_dates[-1]
+        # skip oldest dates as long as the next one is in the newer half of the remaining range
+        first_recent = 0
+        while first_recent + 1 < len(sorted_dates) and max_date - sorted_dates[first_recent] >= 2 * (max_date - sorted_dates[first_recent + 1]):
+            first_recent += 1
+        older_dates = sorted_dates[:first_recent]
+        dates = sorted_dates[first_recent:]
+        avg_date = avg(dates) + (max_date - dates[0]) * .2
+        return sorted(dates, key=lambda date: abs(avg_date - date)) + older_dates[::-1]
 
     @property
     def date_from_content(self) -> str:
@@ -373,38 +489,49 @@ SCAN_FORMATS: dict[Callable[[ScanFile], str]] = {
     "path": lambda scan: scan.path,
     "title": lambda scan: scan.title_or_content,
 }
+# which scans require their text content when printed in a format, missing formats require none
+SCAN_FORMATS_REQUIRE_CONTENT: dict[str, Callable[[ScanFile], bool]] = {
+    "content": lambda scan: True,
+    "date": lambda scan: True,
+    "id-date-title": lambda scan: not scan.description,
+    "id-title": lambda scan: not scan.description,
+    "title": lambda scan: not scan.description,
+}
+
 
+def sorted_dir_entries(path) -> list[os.DirEntry]:
+    # DirEntry caches file type from readdir, so no further stat calls required
+    with os.scandir(path) as it:
+        return sorted(it, key=lambda entry: entry.name)
 
 def iter_files(path) -> Iterable[Path]:
-    for child in Path(path).iterdir():
+    for child in sorted_dir_entries(path):
         if child.is_dir() and not child.name.startswith("."):
-            for child_child in iter_files(child):
-                yield child_child
+            yield from iter_files(child.path)
         elif child.is_file():
-            yield child
+            yield Path(child.path)
 
-def iter_scans(path) -> Iterable[Path]:
+def iter_scans(path) -> Iterable[ScanFile]:
     for scan_path in iter_files(path):
         scan_file = ScanFile.from_path(scan_path)
         if scan_file:
             yield scan_file
 
 def iter_categories(path) -> Iterable[str]:
-    for child in Path(path).iterdir():
+    for child in sorted_dir_entries(path):
         if child.is_dir() and not child.name.startswith(".") and not child.name.startswith("_"):
             yield child.name
-            for child_child_name in iter_categories(child):
+            for child_child_name in iter_categories(child.path):
                 yield f"{child.name}/{child_child_name}"
 
 def sorted_by_id(scans) -> Iterable[ScanFile]:
-    return sorted(scans, key=lambda scan: scan.first_id)
+    return sorted(scans, key=attrgetter("first_id"))
 
 def highest_id(scans) -> int:
-    return max(scans, key=lambda scan: scan.last_id).last_id
+    return max(scan.last_id for scan in scans)
 
-def resolve_per_id(scans):
-    scans = list(scans)
-    ids = [set() for i in range(highest_id(scans) + 1)]
+def resolve_per_id(scans) -> Mapping[int, set[ScanFile]]:
+    ids = defaultdict(set)
     for scan in scans:
         if scan.is_digital:
             ids[0].add(scan)
@@ -422,7 +549,11 @@ def next_id(scans) -> int:
 
 def lookup_scans(scans, *id_ranges):
     scan_ids = resolve_per_id(scans)
-    return {scan for id_r in id_ranges for i in id_r if i < len(scan_ids) for scan in scan_ids[i]}
+    return {scan for id_r in id_ranges for i in id_r for scan in scan_ids.get(i, ())}
+
+def dates_require_content(scans: List[ScanFile]) -> bool:
+    # dates are only searched in text contents if not every file name has one
+    return not all(scan.date for scan in scans)
 
 def extract_dates(scans: List[ScanFile]) -> List[str]:
     # used dict instead of set to gurantee input order
@@ -430,6 +561,8 @@ def extract_dates(scans: List[ScanFile]) -> List[str]:
     for scan in scans:
         if scan.date:
             dates[scan.date] = None
+    if not dates_require_content(scans):
+        return list(dates)
     for scan in scans:
         for date in scan.all_dates_from_content:
             dates[format_date(date)] = None
@@ -476,8 +609,10 @@ def cmd_by_id(args, scans):
 def cmd_check_duplicates(args, scans):
     print_anything = False
     ids = resolve_per_id(scans)
-    ids.pop(0) # remove digital only
-    for id_scans in ids:
+    for i in sorted(ids):
+        if i == 0: # skip digital only
+            continue
+        id_scans = ids[i]
         if 1 < len(id_scans):
             if print_anything:
                 print("---")
@@ -486,23 +621,24 @@ def cmd_check_duplicates(args, scans):
     if print_anything:
         sys.exit(1)
 
+def build_convert_args(scan: ScanFile) -> list[str]:
+    return build_ocr_args(scan.path, out_file=scan.path.with_suffix(".pdf"), additional_args=["--jobs", "1"])
+
+def convert_scan(scan: ScanFile, env: Mapping[str, str]):
+    subprocess.run(build_convert_args(scan), check=True, env=env)
+    scan.path.unlink()
+
 def cmd_convert(args, scans: Iterable[ScanFile]):
-    cmd_list = list[str]()
-    for scan in scans:
-        if not scan.has_already_ocr:
-            cmd_list.append("&&".join([
-                build_ocr_args(scan.path, out_file=scan.path.with_suffix(".pdf"), additional_args=["--jobs", "1"]),
-                build_args([
-                    "rm",
-                    scan.path,
-                ]),
-            ]))
+    from concurrent.futures import ThreadPoolExecutor
+    to_convert = [scan for scan in scans if not scan.has_already_ocr]
     if args.output_commands:
-        for cmd in cmd_list:
-            print(cmd)
-    else:
-        for cmd in cmd_list:
-            subprocess.run(cmd, check=True, shell=True)
+        for scan in to_convert:
+            print(f"{shlex.join(build_convert_args(scan))} && {shlex.join(['rm', str(scan.path)])}")
+    elif to_convert:
+        # each ocrmypdf runs with a single job & tesseract thread, so parallelize over files instead
+        with ThreadPoolExecutor(max_workers=args.max_parallel) as executor:
+            for _ in executor.map(partial(convert_scan, env=ocr_env()), to_convert):
+                pass
 
 def cmd_list(args, scans):
     print_scans(args, sorted_by_id(scans))
@@ -512,6 +648,9 @@ def cmd_list_categories(args, scans):
         print(category)
 
 def cmd_merge(args, scans):
+    from concurrent.futures import ThreadPoolExecutor
+    import locale
+    import tempfile
     # search for scans
     id_r = read_single_id(args).align()
     found = sorted_by_id(lookup_scans(scans, id_r))
@@ -524,22 +663,36 @@ def cmd_merge(args, scans):
     id_r = IdRange.from_scans(found)
     if len(id_r) > 2:
         id_r = id_r.align()
+    # extract text contents in parallel, which are required for the listing & date suggestions
+    if dates_require_content(found):
+        require_text = found
+    else:
+        format_requires_content = SCAN_FORMATS_REQUIRE_CONTENT.get(args.format, lambda scan: False)
+        require_text = [scan for scan in found if format_requires_content(scan)]
+    if require_text:
+        with ThreadPoolExecutor(max_workers=args.max_parallel) as executor:
+            for _ in executor.map(ScanFile.cache_text_content, require_text):
+                pass
     print("will merge following scans:")
     print_scans(args, found, do_view=False)
     print("")
     # combine before for better displayment
-    def build_cmd(output_file: Path):
-        combine_args = build_args([
+    def build_cmds(output_file: Path) -> tuple[list[str], list[str]]:
+        combine_args = [
             "pdfunite",
-            *(scan.path for scan in found),
+            *(str(scan.path) for scan in found),
             "/dev/stdout",
-        ])
+        ]
         ocr_args = build_ocr_args("-", output_file)
-        return f"{combine_args} | {ocr_args}"
-    with tempfile.NamedTemporaryFile() as fp:
-        subprocess.run(build_cmd(fp.name), check=True, shell=True)
+        return combine_args, ocr_args
+    # store in INDEX_DIR, so it can be moved atomically to its category (same filesystem)
+    Path(INDEX_DIR).mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=INDEX_DIR, delete=False) as fp:
+        tmp_path = Path(fp.name)
+    try:
+        run_pipe(*build_cmds(tmp_path))
         if args.view:
-            pdf_viewer = subprocess.Popen(PDF_VIEWER_ARGS + [fp.name], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            pdf_viewer = subprocess.Popen(PDF_VIEWER_ARGS + [str(tmp_path)], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
         # get existing parameters
         doc_dates = [format_date(datetime.now())] + extract_dates(found)
         doc_dates = [] + doc_dates
@@ -563,40 +716,75 @@ def cmd_merge(args, scans):
             pdf_viewer.terminate()
         # execute command
         if args.dry_run:
-            print(build_cmd(output_file))
+            print(" | ".join(shlex.join(cmd) for cmd in build_cmds(output_file)))
             return
         cat_dir = Path(doc_category)
         if not cat_dir.is_dir():
             cat_dir.mkdir(parents=True)
-        Path(fp.name).rename(output_file)
-        Path(fp.name).touch()
+        os.replace(tmp_path, output_file)
         if not args.keep:
             for scan in found:
                 scan.path.unlink()
+    finally:
+        tmp_path.unlink(missing_ok=True) # only exists if not moved
 
 def cmd_missing_ids(args, scans):
     ids = resolve_per_id(scans)
-    ids.pop(0) # remove digital only
-    for i, id_scans in enumerate(ids):
-        if (i % 2) == 0: # odd ids when i is even due to .pop(0)
-            if len(id_scans) <= 0:
-                print(f"{i + 1}+") # due to .pop(0)
+    for i in range(1, max(ids) + 1, 2): # only odd ids
+        if not ids.get(i):
+            print(f"{i}+")
 
 def cmd_next_id(args, scans):
     print(args.force_next_id or next_id(scans))
 
+def warm_text_cache(scan: ScanFile) -> Path:
+    try:
+        scan.cache_text_content()
+    except subprocess.CalledProcessError as e:
+        warn(f"{scan.path}: Failed to extract text content, exited with exit code {e.returncode}")
+    except Exception as e: # errors of Python bindings
+        warn(f"{scan.path}: Failed to extract text content: {e}")
+    return scan.text_cache_path
+
 def cmd_rebuild_index(args, scans: Iterable[ScanFile]):
+    from concurrent.futures import ThreadPoolExecutor
+    import shutil
     index_dir = Path(INDEX_DIR)
+    text_cache_dir = index_dir / TEXT_CACHE_DIR
     if index_dir.exists():
         if not index_dir.is_dir():
             raise Exception(f"Expected '{index_dir}' to be a directory or to not exist")
-        shutil.rmtree(index_dir)
-    index_dir.mkdir()
+        for child in index_dir.iterdir():
+            if child == text_cache_dir: # keep cache across rebuilds
+                continue
+            if child.is_dir() and not child.is_symlink():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+    else:
+        index_dir.mkdir()
     scans = list(scans)
     num_width = max(len(str(highest_id(scans))), MIN_NUM_WIDTH)
-    for scan in scans:
-        if not scan.is_digital:
-            (index_dir / f"{scan.id_range.to_fancy(width=num_width)}_{scan.title}{scan.path.suffix}").symlink_to(".." / scan.path.relative_to(index_dir.parent))
+    # create links relative to an opened index_dir (symlinkat) so its path is not resolved per link
+    index_fd = os.open(index_dir, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for scan in scans:
+            if not scan.is_digital:
+                os.symlink(
+                    ".." / scan.path.relative_to(index_dir.parent),
+                    f"{scan.id_range.to_fancy(width=num_width)}_{scan.title}{scan.path.suffix}",
+                    dir_fd=index_fd,
+                )
+    finally:
+        os.close(index_fd)
+    # pre-warm text cache & drop entries of removed or modified scans
+    with ThreadPoolExecutor(max_workers=args.max_parallel) as executor:
+        used_cache_paths = set(executor.map(warm_text_cache, scans))
+    if text_cache_dir.is_dir():
+        for cache_path in text_cache_dir.iterdir():
+            # skip temporary files, other processes might still write them
+            if cache_path.suffix == ".txt" and cache_path not in used_cache_paths:
+                cache_path.unlink()
 
 def cmd_scan(args, scans):
     scans = list(scans)
@@ -645,6 +833,12 @@ COMMANDS = {
     "test-id-align": cmd_test_id_align,
 }
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-s", "--dry-run", "--simulate", action="store_true")
@@ -656,6 +850,7 @@ def main():
     parser.add_argument("--id", "--ids", required=False)
     parser.add_argument("--view", action="store_true")
     parser.add_argument("--output-commands", action="store_true")
+    parser.add_argument("-j", "--max-parallel", type=positive_int, default=os.cpu_count() or 1)
     parser.add_argument("--skip-convert", action="store_true")
     parser.add_argument("action", choices=list(COMMANDS))
     args = parser.parse_args()
@@ -663,7 +858,10 @@ def main():
     try:
         COMMANDS[args.action](args, scans)
     except subprocess.CalledProcessError as e:
-        warn(f"Failed to run command, exited with exit code {e.returncode}: " + " ".join(e.cmd) if type(e.cmd) == list else e.cmd)
+        warn(f"Failed to run command, exited with exit code {e.returncode}: {shlex.join(e.cmd)}")
+        sys.exit(2)
+    except FileNotFoundError as e: # e.g. command not installed
+        warn(f"{e.strerror}: {e.filename}")
         sys.exit(2)
     except KeyboardInterrupt:
         print("Aborted by user")